@@ -1,134 +1,404 @@
+import atexit
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.feather as feather
+import altair as alt
+
+try:
+    # optional, faster NaN-aware reductions
+    from bottleneck import nanmax, nanmean, nanmedian, nanmin
+except ImportError:
+    from numpy import nanmax, nanmean, nanmedian, nanmin
 
 # Set up page layout and styling
 st.set_page_config(layout="wide")
-sns.set_style("whitegrid")
+CHART_HEIGHT = 350
+# Larger selections are randomly sampled down to this many scatter points
+SCATTER_MAX_POINTS = 5000
+
+# Columns every row must have to be kept
+ESSENTIAL_COLUMNS = ['price', 'cost', 'units_sold', 'category', 'brand']
+# Columns shown in the top products table
+TOP_PRODUCT_COLUMNS = ['title', 'brand', 'category', 'price', 'cost', 'units_sold', 'profit']
+
+# Parsed uploads are kept as Feather files so reloads skip CSV parsing;
+# only the most recently used CACHE_MAX_FILES of them are kept
+CACHE_MAX_FILES = 8
+# Bump whenever load_data's preprocessing changes so stale files are ignored
+CACHE_VERSION = 2
+
+@st.cache_resource
+def feather_cache_dir() -> Path:
+    """
+    Private (mode 0700) directory for this process's Feather files,
+    removed when the process exits.
+    """
+    path = Path(tempfile.mkdtemp(prefix='apd_'))
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
 
-# Cache data loading for performance
-@st.cache(allow_output_mutation=True)
-def load_data(file) -> pd.DataFrame:
+def _last_used(path) -> float:
+    """
+    Modification time of a cache file, or 0 if another session removed it.
+    """
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+def prune_feather_cache(cache_dir) -> None:
+    """
+    Delete all but the CACHE_MAX_FILES most recently used Feather files.
+    """
+    files = sorted(cache_dir.glob('apd_v*.feather'), key=_last_used, reverse=True)
+    for path in files[CACHE_MAX_FILES:]:
+        path.unlink(missing_ok=True)
+
+def file_digest(file) -> str:
+    """
+    Content hash of an uploaded file, used as its cache key.
+    """
+    return hashlib.sha256(file.getvalue()).hexdigest()
+
+# Cache data loading for performance. cache_resource hands every rerun the
+# same DataFrame instead of unpickling a copy; nothing downstream mutates it
+@st.cache_resource(max_entries=4)
+def load_data(digest, _file) -> pd.DataFrame:
     """
     Load the CSV file into a DataFrame, preprocess columns,
     and calculate additional fields like margin, revenue, and profit.
+    `digest` is the file's content hash (see file_digest); the result is
+    also stored on disk as Feather under that name.
     """
-    df = pd.read_csv(file)
-    df.columns = df.columns.str.lower()  # normalize column names
+    cache_dir = feather_cache_dir()
+    cache_path = cache_dir / f"apd_v{CACHE_VERSION}_{digest}.feather"
+    try:
+        os.utime(cache_path)  # mark as recently used for pruning
+        return pd.read_feather(cache_path)
+    except FileNotFoundError:
+        pass
+
+    # Arrow's multithreaded CSV reader is much faster than pd.read_csv on big uploads
+    table = pacsv.read_csv(
+        pa.BufferReader(_file.getvalue()),
+        read_options=pacsv.ReadOptions(block_size=8 << 20, use_threads=True),
+        convert_options=pacsv.ConvertOptions(strings_can_be_null=True),
+    )
+    table = table.rename_columns([c.lower() for c in table.column_names])  # normalize column names
     # Drop rows with missing essential values
-    df = df.dropna(subset=['price', 'cost', 'units_sold', 'category', 'brand'])
-    # Calculate extra fields
-    df['margin'] = df['price'] - df['cost']
-    df['revenue'] = df['price'] * df['units_sold']
-    df['profit'] = df['margin'] * df['units_sold']
+    valid = pc.is_valid(table[ESSENTIAL_COLUMNS[0]])
+    for col in ESSENTIAL_COLUMNS[1:]:
+        valid = pc.and_(valid, pc.is_valid(table[col]))
+    table = table.filter(valid)
+    df = table.to_pandas(self_destruct=True, split_blocks=True)
+    del table
+    # Calculate extra fields in one pass over the raw arrays, then shrink
+    # dtypes once revenue/profit are computed at full precision:
+    # float32 prices, smallest int for units, categorical labels
+    price = df['price'].to_numpy(dtype=np.float64)
+    cost = df['cost'].to_numpy(dtype=np.float64)
+    units = df['units_sold'].to_numpy()
+    margin = np.subtract(price, cost)
+    revenue = np.multiply(price, units)
+    profit = np.multiply(margin, units)
+    df = df.assign(
+        price=price.astype(np.float32),
+        cost=cost.astype(np.float32),
+        margin=margin.astype(np.float32),
+        revenue=revenue,
+        profit=profit,
+    )
+    df['units_sold'] = pd.to_numeric(df['units_sold'], downcast='integer')
+    for col in ('category', 'brand'):
+        df[col] = df[col].astype('category')
+
+    # Write to a temporary name first so other sessions never read a partial file
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    feather.write_feather(df, tmp_path, compression='lz4')
+    os.replace(tmp_path, cache_path)
+    prune_feather_cache(cache_dir)
     return df
 
-def compute_metrics(df):
+def category_mask(series, selected) -> np.ndarray:
+    """
+    Boolean mask of rows whose categorical value is in `selected`,
+    looked up per row through a small table indexed by category code.
+    """
+    lookup = np.zeros(len(series.cat.categories), dtype=bool)
+    positions = series.cat.categories.get_indexer(list(selected))
+    lookup[positions[positions >= 0]] = True
+    return lookup[series.cat.codes.to_numpy()]
+
+def filter_rows(df, categories, brands, price_range) -> np.ndarray:
+    """
+    Positions of the rows matching the selected categories and brands within
+    the price range. Callers index columns with these instead of copying the
+    matching rows into a new dataframe.
+    """
+    # AND each predicate into one mask in place, reusing a single scratch buffer
+    price = df['price'].to_numpy()
+    mask = category_mask(df['category'], categories)
+    np.logical_and(mask, category_mask(df['brand'], brands), out=mask)
+    scratch = np.greater_equal(price, price_range[0])
+    np.logical_and(mask, scratch, out=mask)
+    np.less_equal(price, price_range[1], out=scratch)
+    np.logical_and(mask, scratch, out=mask)
+    return np.flatnonzero(mask)
+
+def take_rows(df, rows, columns=None) -> pd.DataFrame:
+    """
+    The given row positions of the dataframe (all rows when `rows` is None),
+    restricted to `columns` if given, so only those cells are copied.
+    """
+    if rows is None:
+        return df if columns is None else df[columns]
+    if columns is None:
+        return df.iloc[rows]
+    # get_loc raises KeyError for a missing column; get_indexer's -1 would
+    # silently select the last column instead
+    return df.iloc[rows, [df.columns.get_loc(c) for c in columns]]
+
+def groupby_sum(df, by, col, rows=None) -> pd.Series:
+    """
+    Sum `col` per observed group of the categorical column `by`, over the
+    given row positions (all rows when `rows` is None).
+    Bins directly on the integer category codes with np.bincount.
+    """
+    codes = df[by].cat.codes.to_numpy()
+    labels = df[by].cat.categories
+    values = df[col].to_numpy()
+    if rows is not None:
+        codes, values = codes[rows], values[rows]
+    sums = np.bincount(codes, weights=values, minlength=len(labels))
+    observed = np.bincount(codes, minlength=len(labels)) > 0
+    sums = sums.astype(np.int64 if values.dtype.kind in 'iu' else np.float64)
+    return pd.Series(sums[observed], index=labels[observed].rename(by), name=col)
+
+def compute_aggregates(df, rows=None) -> dict:
+    """
+    Per-group totals shared by the metrics and the bar plots,
+    over the given row positions (all rows when `rows` is None).
+    """
+    return {
+        'units_by_category': groupby_sum(df, 'category', 'units_sold', rows).sort_values(ascending=False),
+        'profit_by_brand': groupby_sum(df, 'brand', 'profit', rows).nlargest(15),
+    }
+
+@st.cache_data
+def compute_metrics(data_key, _df) -> dict:
     """
     Calculate key business metrics from the dataframe.
-    Returns a dictionary with metric names and values.
+    Returns a dictionary with metric names and values, cached per upload
+    (`data_key` is its content hash; the dataframe itself is not hashed).
     """
+    # One agg call so each column is reduced in a single sweep
+    agg = _df.agg({
+        'revenue': ['sum'],
+        'profit': ['sum'],
+        'units_sold': ['sum'],
+        'margin': ['mean'],
+    })
+    # float64 so bottleneck's sequential sum does not drift on float32 prices
+    price = _df['price'].to_numpy(dtype=np.float64)
     metrics = {
-        'Total Revenue': df['revenue'].sum(),
-        'Total Profit': df['profit'].sum(),
-        'Total Units Sold': df['units_sold'].sum(),
-        'Average Price': df['price'].mean(),
-        'Median Price': df['price'].median(),
-        'Price Min': df['price'].min(),
-        'Price Max': df['price'].max(),
-        'Average Margin': df['margin'].mean(),
-        'Number of Products': df['title'].nunique() if 'title' in df.columns else df.shape[0],
-        'Number of Unique Brands': df['brand'].nunique(),
-        'Average Rating': df['rating'].mean() if 'rating' in df.columns else np.nan,
-        'Average Reviews per Product': df['reviews_count'].mean() if 'reviews_count' in df.columns else np.nan,
-        'Products with Rating > 4 (%)': (df['rating'] > 4).mean() * 100 if 'rating' in df.columns else np.nan,
+        'Total Revenue': agg.loc['sum', 'revenue'],
+        'Total Profit': agg.loc['sum', 'profit'],
+        'Total Units Sold': agg.loc['sum', 'units_sold'],
+        'Average Price': nanmean(price),
+        'Median Price': nanmedian(price),
+        'Price Min': nanmin(price),
+        'Price Max': nanmax(price),
+        'Average Margin': agg.loc['mean', 'margin'],
+        'Number of Products': _df['title'].nunique() if 'title' in _df.columns else _df.shape[0],
+        'Number of Unique Brands': _df['brand'].nunique(),
+        'Average Rating': np.nan,
+        'Average Reviews per Product': np.nan,
+        'Products with Rating > 4 (%)': np.nan,
     }
+    review_cols = [c for c in ('rating', 'reviews_count') if c in _df.columns]
+    if review_cols:
+        review_means = _df[review_cols].agg('mean')
+        metrics['Average Rating'] = review_means.get('rating', np.nan)
+        metrics['Average Reviews per Product'] = review_means.get('reviews_count', np.nan)
+    if 'rating' in _df.columns:
+        metrics['Products with Rating > 4 (%)'] = (_df['rating'] > 4).mean() * 100
     
     # Best product by profit
-    if 'profit' in df.columns and 'title' in df.columns:
-        max_profit_row = df.loc[df['profit'].idxmax()]
+    if 'profit' in _df.columns and 'title' in _df.columns:
+        max_profit_row = _df.iloc[int(np.nanargmax(_df['profit'].to_numpy()))]
         metrics['Best Product by Profit'] = f"{max_profit_row['title']} (${max_profit_row['profit']:.2f})"
     else:
         metrics['Best Product by Profit'] = 'N/A'
     
     # Best product by rating
-    if 'rating' in df.columns and 'title' in df.columns:
-        max_rating_row = df.loc[df['rating'].idxmax()]
+    if 'rating' in _df.columns and 'title' in _df.columns:
+        max_rating_row = _df.iloc[int(np.nanargmax(_df['rating'].to_numpy()))]
         metrics['Best Product by Rating'] = f"{max_rating_row['title']} ({max_rating_row['rating']:.1f})"
     else:
         metrics['Best Product by Rating'] = 'N/A'
 
     # Top 3 categories by units sold
-    top_categories = df.groupby('category')['units_sold'].sum().sort_values(ascending=False).head(3)
+    top_categories = compute_aggregates(_df)['units_by_category'].head(3)
     metrics['Top 3 Categories by Units Sold'] = ', '.join(top_categories.index)
 
     return metrics
 
-def plot_units_sold_by_category(df):
+def export_csv(df, rows=None) -> bytes:
     """
-    Bar plot of total units sold per category.
+    CSV bytes of the selected rows for download.
     """
-    data = df.groupby('category')['units_sold'].sum().sort_values(ascending=False)
-    fig, ax = plt.subplots(figsize=(10,5))
-    sns.barplot(x=data.index, y=data.values, ax=ax)
-    ax.set_title("Units Sold by Category")
-    ax.set_xlabel("Category")
-    ax.set_ylabel("Units Sold")
-    plt.xticks(rotation=45)
-    return fig
+    # Arrow's C++ writer is much faster than DataFrame.to_csv
+    buf = io.BytesIO()
+    pacsv.write_csv(pa.Table.from_pandas(take_rows(df, rows), preserve_index=False), buf)
+    return buf.getvalue()
 
-def plot_profit_by_brand(df):
+def export_feather(df, rows=None) -> bytes:
     """
-    Bar plot of total profit per brand, showing top 15 brands.
+    Feather bytes of the selected rows for download.
     """
-    data = df.groupby('brand')['profit'].sum().sort_values(ascending=False).head(15)
-    fig, ax = plt.subplots(figsize=(10,5))
-    sns.barplot(x=data.index, y=data.values, ax=ax)
-    ax.set_title("Profit by Brand (Top 15)")
-    ax.set_xlabel("Brand")
-    ax.set_ylabel("Profit")
-    plt.xticks(rotation=45)
-    return fig
+    buf = io.BytesIO()
+    table = pa.Table.from_pandas(take_rows(df, rows), preserve_index=False)
+    feather.write_feather(table, buf, compression='lz4')
+    return buf.getvalue()
 
-def plot_margin_vs_price(df):
+def plot_units_sold_by_category(data):
+    """
+    Bar chart of total units sold per category, from the sorted aggregate.
+    """
+    source = data.rename('units_sold').rename_axis('category').reset_index()
+    return alt.Chart(source, title="Units Sold by Category").mark_bar().encode(
+        x=alt.X('category:N', sort='-y', title="Category", axis=alt.Axis(labelAngle=-45)),
+        y=alt.Y('units_sold:Q', title="Units Sold"),
+    ).properties(height=CHART_HEIGHT)
+
+def plot_profit_by_brand(data):
+    """
+    Bar chart of total profit per brand, from the top 15 aggregate.
+    """
+    source = data.rename('profit').rename_axis('brand').reset_index()
+    return alt.Chart(source, title="Profit by Brand (Top 15)").mark_bar().encode(
+        x=alt.X('brand:N', sort='-y', title="Brand", axis=alt.Axis(labelAngle=-45)),
+        y=alt.Y('profit:Q', title="Profit"),
+    ).properties(height=CHART_HEIGHT)
+
+def plot_margin_vs_price(df, rows=None):
     """
     Scatter plot of margin vs price, colored by brand and sized by units sold.
     """
-    fig, ax = plt.subplots(figsize=(10,5))
-    sns.scatterplot(data=df, x='price', y='margin', hue='brand', size='units_sold',
-                    sizes=(20, 200), alpha=0.7, ax=ax, legend=False)
-    ax.set_title("Margin vs Price")
-    ax.set_xlabel("Price")
-    ax.set_ylabel("Margin")
-    plt.xticks(rotation=45)
-    return fig
+    if rows is None:
+        rows = np.arange(len(df))
+    if len(rows) > SCATTER_MAX_POINTS:
+        rng = np.random.default_rng(0)
+        rows = np.sort(rng.choice(rows, size=SCATTER_MAX_POINTS, replace=False))
+        title = f"Margin vs Price (random sample of {SCATTER_MAX_POINTS:,} products)"
+    else:
+        title = "Margin vs Price"
+    source = take_rows(df, rows, ['price', 'margin', 'units_sold', 'brand'])
+    return alt.Chart(source, title=title).mark_circle(opacity=0.7).encode(
+        x=alt.X('price:Q', title="Price"),
+        y=alt.Y('margin:Q', title="Margin"),
+        color=alt.Color('brand:N', legend=None),
+        size=alt.Size('units_sold:Q', scale=alt.Scale(range=[20, 200]), legend=None),
+    ).properties(height=CHART_HEIGHT)
 
-def plot_rating_distribution(df):
+def plot_rating_distribution(df, rows=None):
     """
     Histogram of product ratings, if ratings are available.
+    Bins are counted here so only ten rows are sent to the browser.
     """
     if 'rating' in df.columns:
-        fig, ax = plt.subplots(figsize=(8,4))
-        sns.histplot(df['rating'], bins=10, kde=False, ax=ax)
-        ax.set_title("Rating Distribution")
-        ax.set_xlabel("Rating")
-        ax.set_ylabel("Number of Products")
-        return fig
+        ratings = df['rating'].to_numpy()
+        if rows is not None:
+            ratings = ratings[rows]
+        counts, edges = np.histogram(ratings[~np.isnan(ratings)], bins=10)
+        source = pd.DataFrame({'start': edges[:-1], 'end': edges[1:], 'count': counts})
+        return alt.Chart(source, title="Rating Distribution").mark_bar().encode(
+            x=alt.X('start:Q', title="Rating"),
+            x2='end:Q',
+            y=alt.Y('count:Q', title="Number of Products"),
+        ).properties(height=CHART_HEIGHT)
     else:
         return None
 
+PLOTS = {
+    'units_by_category': plot_units_sold_by_category,
+    'profit_by_brand': plot_profit_by_brand,
+    'margin_vs_price': plot_margin_vs_price,
+    'rating_distribution': plot_rating_distribution,
+}
+
+def chart_spec(plot_name, *args):
+    """
+    Vega-Lite spec (with inlined data) of one of the PLOTS, as a plain dict
+    that is cheap to cache and skips Altair's chart construction and
+    validation when reused. Returns None when the plot has nothing to show.
+    """
+    chart = PLOTS[plot_name](*args)
+    return None if chart is None else chart.to_dict()
+
+# Download formats: builder, file extension and MIME type
+EXPORT_FORMATS = {
+    'CSV': (export_csv, 'csv', 'text/csv'),
+    'Feather': (export_feather, 'feather', 'application/octet-stream'),
+}
+
+@st.cache_data(max_entries=16)
+def render_state(data_key, _df, categories, brands, price_range) -> dict:
+    """
+    Everything shown below the filters for one filter state except the
+    download payload: row count, preview and top products tables and chart
+    specs. Cached on the upload hash plus the selections, so repeating a
+    selection skips filtering, aggregation and charting. Entries are
+    bounded since every slider position is a new filter state.
+    """
+    rows = filter_rows(_df, categories, brands, price_range)
+    aggregates = compute_aggregates(_df, rows)
+    top = pd.Series(_df['profit'].to_numpy()[rows]).nlargest(10).index.to_numpy()
+    top_columns = [c for c in TOP_PRODUCT_COLUMNS if c in _df.columns]
+    return {
+        'count': len(rows),
+        'preview': take_rows(_df, rows[:10]),
+        'top_products': take_rows(_df, rows[top], top_columns),
+        'charts': {
+            'units_by_category': chart_spec('units_by_category', aggregates['units_by_category']),
+            'profit_by_brand': chart_spec('profit_by_brand', aggregates['profit_by_brand']),
+            'margin_vs_price': chart_spec('margin_vs_price', _df, rows),
+            'rating_distribution': chart_spec('rating_distribution', _df, rows),
+        },
+    }
+
+@st.cache_data(max_entries=4)
+def export_selection(data_key, _df, categories, brands, price_range, fmt) -> bytes:
+    """
+    Download payload of the selected rows in one of the EXPORT_FORMATS.
+    Kept apart from render_state so only the chosen format is serialized,
+    and only a few of these full-size payloads stay in memory.
+    """
+    rows = filter_rows(_df, categories, brands, price_range)
+    return EXPORT_FORMATS[fmt][0](_df, rows)
+
 def main():
     st.title("📊 Amazon Products Dashboard")
 
     # File uploader for CSV
     uploaded_file = st.file_uploader("Upload your Amazon products CSV file", type=["csv"])
     if uploaded_file:
-        df = load_data(uploaded_file)
+        data_key = file_digest(uploaded_file)
+        df = load_data(data_key, uploaded_file)
 
         # Calculate and display metrics
-        metrics = compute_metrics(df)
+        metrics = compute_metrics(data_key, df)
         st.markdown("### 📈 Key Metrics")
         cols = st.columns(4)
         numeric_metrics = ['Total Revenue', 'Total Profit', 'Total Units Sold', 'Average Price', 
@@ -153,51 +423,66 @@ def main():
         st.markdown("### 🎯 Filters")
 
         # Filters for category, brand, price range
-        categories = df['category'].unique()
-        brands = df['brand'].unique()
-        price_min, price_max = float(df['price'].min()), float(df['price'].max())
+        # Options come straight from the categorical dtypes, no scan of the rows
+        categories = df['category'].cat.categories.tolist()
+        brands = df['brand'].cat.categories.tolist()
+        price_min, price_max = float(metrics['Price Min']), float(metrics['Price Max'])
+
+        # Select everything when a new file is loaded, or when Streamlit dropped
+        # the widget values because they were not rendered (file cleared and
+        # re-uploaded); otherwise the widgets keep their own state
+        filter_keys = ('selected_categories', 'selected_brands', 'selected_price')
+        if (st.session_state.get('filters_data_key') != data_key
+                or any(k not in st.session_state for k in filter_keys)):
+            st.session_state['filters_data_key'] = data_key
+            st.session_state['selected_categories'] = categories
+            st.session_state['selected_brands'] = brands
+            st.session_state['selected_price'] = (price_min, price_max)
 
-        selected_categories = st.multiselect("Categories", categories, default=list(categories))
-        selected_brands = st.multiselect("Brands", brands, default=list(brands))
-        selected_price = st.slider("Price Range", price_min, price_max, (price_min, price_max))
+        selected_categories = st.multiselect("Categories", categories, key='selected_categories')
+        selected_brands = st.multiselect("Brands", brands, key='selected_brands')
+        selected_price = st.slider("Price Range", price_min, price_max, key='selected_price')
 
-        # Filter dataframe based on user selection
-        df_filtered = df[
-            df['category'].isin(selected_categories) &
-            df['brand'].isin(selected_brands) &
-            df['price'].between(selected_price[0], selected_price[1])
-        ]
+        # Filter, aggregate and render the selection in one cached step
+        state = render_state(data_key, df, selected_categories, selected_brands, selected_price)
+        charts = state['charts']
 
-        st.markdown(f"##### 🔎 Showing {len(df_filtered)} filtered products")
-        st.dataframe(df_filtered.head(10))
+        st.markdown(f"##### 🔎 Showing {state['count']} filtered products")
+        st.dataframe(state['preview'])
 
         st.markdown("---")
         col1, col2 = st.columns(2)
 
         # Show plots side by side
         with col1:
-            st.pyplot(plot_units_sold_by_category(df_filtered))
-            fig_rating = plot_rating_distribution(df_filtered)
-            if fig_rating:
-                st.pyplot(fig_rating)
+            st.vega_lite_chart(charts['units_by_category'], use_container_width=True)
+            if charts['rating_distribution'] is not None:
+                st.vega_lite_chart(charts['rating_distribution'], use_container_width=True)
 
         with col2:
-            st.pyplot(plot_profit_by_brand(df_filtered))
-            st.pyplot(plot_margin_vs_price(df_filtered))
+            st.vega_lite_chart(charts['profit_by_brand'], use_container_width=True)
+            st.vega_lite_chart(charts['margin_vs_price'], use_container_width=True)
 
         st.markdown("---")
         st.markdown("### 🏆 Top 10 Most Profitable Products")
-        top_products = df_filtered.sort_values('profit', ascending=False).head(10)
-        st.dataframe(top_products[['title', 'brand', 'category', 'price', 'cost', 'units_sold', 'profit']])
+        st.dataframe(state['top_products'])
 
-        # Button to download filtered data as CSV
+        # Button to download filtered data as CSV or Feather. The file is only
+        # built once asked for, and again only after the selection changes
         st.markdown("---")
-        st.download_button(
-            label="📥 Download Filtered CSV",
-            data=df_filtered.to_csv(index=False).encode('utf-8'),
-            file_name='amazon_filtered_products.csv',
-            mime='text/csv'
-        )
+        fmt = st.radio("Download format", list(EXPORT_FORMATS), horizontal=True)
+        _, extension, mime = EXPORT_FORMATS[fmt]
+        download_request = (data_key, tuple(selected_categories), tuple(selected_brands),
+                            tuple(selected_price), fmt)
+        if st.button(f"Prepare {fmt} download"):
+            st.session_state['download_request'] = download_request
+        if st.session_state.get('download_request') == download_request:
+            st.download_button(
+                label=f"📥 Download Filtered {fmt}",
+                data=export_selection(data_key, df, selected_categories, selected_brands, selected_price, fmt),
+                file_name=f'amazon_filtered_products.{extension}',
+                mime=mime
+            )
 
 if __name__ == "__main__":
     main()